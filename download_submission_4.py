@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
+import asyncio
+import concurrent.futures
+import functools
 import os
 import pathlib
+import random
 import sys
 import time
+from itertools import islice
+import aiohttp
 import codepost
 import dotenv
 dotenv.load_dotenv()
@@ -12,6 +18,11 @@ COURSE_ID = 5290 # FIXME depends on your course
 ASSIGNMENT_ID = 36143 # FIXME depends on your assignment
 OUTDIR = "./downloads"   # base folder for saving files
 TARGET_FILENAME = "pa4.py"  # Only download this file 
+API_BASE = "https://api.codepost.io"  # REST endpoint used for the file downloads
+MAX_CONCURRENCY = 32  # submissions fetched at the same time
+MAX_RETRIES = 5  # per request, on HTTP 429 / 5xx, dropped connections and timeouts
+MAX_BACKOFF = 60  # seconds, cap on the exponential retry delay
+IO_WORKERS = 8  # threads writing downloaded files to disk
 # --------------------------------------
 def get_api_key():
     key = os.getenv("CODEPOST_API_KEY", "").strip()
@@ -19,15 +30,215 @@ def get_api_key():
         sys.exit("Missing API key. Set CODEPOST_API_KEY or edit the script to hardcode it.")
     return key
 
+# Characters replaced with "_" by safe_folder_name
+_BAD_CHARS_TABLE = str.maketrans({ch: "_" for ch in '<>:"/\\|?*'})
+
+@functools.lru_cache(maxsize=4096)  # the same rel paths ("src", ...) repeat for every student
 def safe_folder_name(name: str) -> str:
     # make safe-ish folder names on all OSes
-    bad = '<>:"/\\|?*'
-    for ch in bad:
-        name = name.replace(ch, "_")
-    return name.strip()
+    return name.translate(_BAD_CHARS_TABLE).strip()
+
+def reset_delay(headers):
+    """Seconds until the rate-limit window in `headers` resets, or None if not given."""
+    try:
+        reset = float(headers.get("X-RateLimit-Reset", ""))
+    except ValueError:
+        return None
+    # Either an epoch timestamp or a number of seconds until the reset
+    return max(0.0, reset - time.time()) if reset > 1e9 else reset
+
+def backoff(attempt: int) -> float:
+    """Exponential delay before retry number `attempt` (0-based)."""
+    # Jitter keeps throttled requests from all retrying at the same instant
+    return min(MAX_BACKOFF, 2 ** attempt + random.random())
+
+def retry_delay(resp, attempt: int) -> float:
+    """Seconds to wait before retrying a throttled or failed request."""
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    if resp.headers.get("X-RateLimit-Remaining") == "0":
+        delay = reset_delay(resp.headers)
+        if delay is not None:
+            return delay
+    return backoff(attempt)
+
+class RateLimiter:
+    """Spreads requests evenly over what is left of the API's rate-limit window.
+
+    The budget is taken from the X-RateLimit-Remaining / X-RateLimit-Reset
+    headers of each response; until the first response arrives requests are
+    not paced.
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._remaining = None  # requests left in the current window
+        self._reset_at = 0.0    # time.time() at which the window resets
+        self._next_at = 0.0     # earliest time.time() for the next request
+
+    def update(self, headers) -> None:
+        try:
+            remaining = int(headers.get("X-RateLimit-Remaining", ""))
+        except ValueError:
+            return
+        delay = reset_delay(headers)
+        if delay is None:
+            return
+        self._remaining = remaining
+        self._reset_at = time.time() + delay
+
+    async def acquire(self) -> None:
+        # Waiters queue on the lock, so sleeping here paces every request
+        async with self._lock:
+            if self._remaining is None:
+                return
+            now = time.time()
+            window = max(0.0, self._reset_at - now)
+            if self._remaining <= 0:
+                await asyncio.sleep(window)
+                self._remaining = None
+                return
+            if self._next_at > now:
+                await asyncio.sleep(self._next_at - now)
+            self._next_at = max(now, self._next_at) + window / self._remaining
+            self._remaining -= 1
+
+async def throttled_get(session, limiter: RateLimiter, url: str):
+    """GET a CodePost REST resource within the rate limit.
+
+    Backs off and retries on 429 / 5xx, dropped connections and timeouts;
+    anything else (403, 404, a non-JSON body, ...) is raised right away.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        await limiter.acquire()
+        try:
+            async with session.get(url) as resp:
+                limiter.update(resp.headers)
+                if resp.status != 429 and resp.status < 500:
+                    resp.raise_for_status()
+                    return await resp.json()
+                if attempt == MAX_RETRIES:
+                    resp.raise_for_status()
+                delay = retry_delay(resp, attempt)
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES:
+                raise
+            delay = backoff(attempt)
+        await asyncio.sleep(delay)
+
+def write_file(out_file: str, code: str, make_parent: bool = False) -> bool:
+    """Write a downloaded file as UTF-8; returns True if the fallback encoding was needed."""
+    # Submission folders already exist; only a student's own subfolders need creating
+    if make_parent:
+        os.makedirs(os.path.dirname(out_file), exist_ok=True)
+    # Encode up front and write the bytes in one call: no newline translation,
+    # and a failed encode no longer leaves a half-written file to redo
+    try:
+        data = code.encode("utf-8")
+        fallback = False
+    except UnicodeEncodeError:
+        # Fallback encoding
+        data = code.encode("utf-8", errors="replace")
+        fallback = True
+    pathlib.Path(out_file).write_bytes(data)
+    return fallback
+
+def submission_folder(sub) -> str:
+    """Build a stable folder name per submission (handles partners/groups)."""
+    students = getattr(sub, "students", []) or []
+    if not students:
+        return f"submission_{sub.id}"
+    return ",".join(sorted(students))
+
+def peek_file(f) -> dict:
+    """What is already known about a submission file, without triggering a fetch."""
+    # The SDK's lazy file objects expose only {"id": ...} through `_data`; any
+    # other attribute access is a blocking request.
+    data = getattr(f, "_data", None)
+    if isinstance(data, dict) and "id" in data:
+        return dict(data)
+    return {"id": getattr(f, "id", f)}
+
+async def fetch_submission(sub, session, limiter, sem, base_str: str, io_pool):
+    """Download the target file of one submission; returns (folder, found_target, writes).
+
+    Writes are queued on `io_pool` rather than awaited, so the next downloads
+    don't wait on the disk; `writes` holds (label, future) pairs.
+    """
+    folder = submission_folder(sub)
+    sub_dir = os.path.join(base_str, safe_folder_name(folder))
+
+    # Check names before fetching: files already known not to be the target are
+    # dropped, and only files still missing their name or code are requested.
+    known = [peek_file(f) for f in (getattr(sub, "files", []) or [])]
+    wanted = [data for data in known if data.get("name") in (None, TARGET_FILENAME)]
+    to_fetch = [data["id"] for data in wanted if data.get("code") is None]
+    async with sem:
+        fetched = await asyncio.gather(*[throttled_get(session, limiter, f"{API_BASE}/files/{fid}/") for fid in to_fetch],
+                                       return_exceptions=True)
+    # A file that can't be fetched is reported and skipped; the rest of the
+    # submission (and the run) carries on without it
+    fetched_by_id = {}
+    failed = set()
+    for fid, data in zip(to_fetch, fetched):
+        if isinstance(data, (aiohttp.ClientError, asyncio.TimeoutError, ValueError)):
+            reason = f"HTTP {data.status}: {data.message}" if isinstance(data, aiohttp.ClientResponseError) else repr(data)
+            print(f"  [skip] {folder}: file {fid} could not be fetched ({reason})")
+            failed.add(fid)
+        elif isinstance(data, BaseException):
+            raise data
+        else:
+            fetched_by_id[fid] = data
+    files = [fetched_by_id.get(data["id"], data) for data in wanted if data["id"] not in failed]
+
+    found_target = False
+    writes = []
+
+    for data in files:
+        name = data.get("name") or f"file_{data.get('id', 'unknown')}"
+
+        # Only process the target file
+        if name != TARGET_FILENAME:
+            continue
+
+        found_target = True
+        rel_path = data.get("path")  # optional subdirectory
+        code = data.get("code")
+
+        # Recreate any folder structure the student had
+        out_dir = os.path.join(sub_dir, safe_folder_name(rel_path)) if rel_path else sub_dir
+        out_file = os.path.join(out_dir, name)
+
+        # Files in CodePost are text; write as UTF-8, fall back if needed
+        if code is None:
+            print(f"  [skip] {folder}/{name} (no text content)")
+            continue
+
+        writes.append((f"{folder}/{name}", io_pool.submit(write_file, out_file, code, bool(rel_path))))
+
+    if not found_target:
+        reason = "some files could not be fetched" if failed else f"no {TARGET_FILENAME} found"
+        print(f"  ✗ {folder} ({reason})")
+
+    return folder, found_target, writes
+
+async def download_all(submissions, base: pathlib.Path, api_key: str, io_pool):
+    """Fetch every submission concurrently; returns the fetch_submission results."""
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    limiter = RateLimiter()
+    headers = {"Authorization": f"Token {api_key}"}
+    connector = aiohttp.TCPConnector(limit_per_host=64)
+    base_str = str(base)
+    async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
+        return await asyncio.gather(*[fetch_submission(s, session, limiter, sem, base_str, io_pool) for s in submissions])
 
 def main():
-    codepost.configure_api_key(get_api_key())
+    api_key = get_api_key()
+    codepost.configure_api_key(api_key)
 
     # 1) Find course
     course = codepost.course.retrieve(COURSE_ID)
@@ -56,77 +267,32 @@ def main():
         except Exception as e:
             sys.exit(f"Could not enumerate submissions: {e}")
 
+    # Create every submission folder up front in one pass, so the concurrent
+    # downloads never mkdir (or race on) the same parents
+    base_str = str(base)
+    for sub_dir in {os.path.join(base_str, safe_folder_name(submission_folder(s))) for s in submissions}:
+        os.makedirs(sub_dir, exist_ok=True)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=IO_WORKERS) as io_pool:
+        results = asyncio.run(download_all(submissions, base, api_key, io_pool))
+        writes = [w for _, _, sub_writes in results for w in sub_writes]
+        concurrent.futures.wait([fut for _, fut in writes])
+
     total_files = 0
-    skipped_students = []
-    
-    for sub in submissions:
-        # Build a stable folder name per submission (handles partners/groups)
-        students = getattr(sub, "students", []) or []
-        if not students:
-            folder = f"submission_{sub.id}"
-        else:
-            folder = ",".join(sorted(students))
-        sub_dir = base / safe_folder_name(folder)
-        sub_dir.mkdir(parents=True, exist_ok=True)
-
-        # Iterate files in the submission
-        files = getattr(sub, "files", []) or []
-        found_target = False
-        
-        for f in files:
-            # Some SDK objects are lazy; refresh if supported
-            try:
-                f.refresh()
-            except Exception:
-                pass
-
-            name = getattr(f, "name", f"file_{getattr(f,'id','unknown')}")
-            
-            # Only process the target file
-            if name != TARGET_FILENAME:
-                continue
-            
-            found_target = True
-            rel_path = getattr(f, "path", None)  # optional subdirectory
-            code = getattr(f, "code", None)
-
-            # Recreate any folder structure the student had
-            out_dir = sub_dir / safe_folder_name(rel_path) if rel_path else sub_dir
-            out_dir.mkdir(parents=True, exist_ok=True)
-            out_file = out_dir / name
-
-            # Files in CodePost are text; write as UTF-8, fall back if needed
-            if code is None:
-                print(f"  [skip] {folder}/{name} (no text content)")
-                continue
-
-            try:
-                with open(out_file, "w", encoding="utf-8", newline="") as fh:
-                    fh.write(code)
-                total_files += 1
-                print(f"  ✓ {folder}/{name}")
-            except UnicodeEncodeError:
-                # Fallback encoding
-                with open(out_file, "w", encoding="utf-8", errors="replace", newline="") as fh:
-                    fh.write(code)
-                total_files += 1
-                print(f"  ✓ {folder}/{name} (encoding fallback)")
-
-            # Optional: light throttling to be polite to the API on very large classes
-            # time.sleep(0.02)
-        
-        if not found_target:
-            skipped_students.append(folder)
-            print(f"  ✗ {folder} (no {TARGET_FILENAME} found)")
+    for label, fut in writes:
+        fallback = fut.result()
+        total_files += 1
+        print(f"  ✓ {label}" + (" (encoding fallback)" if fallback else ""))
+    skipped_students = sorted({folder for folder, found_target, _ in results if not found_target})
 
     print(f"\n✅ Done. Saved {total_files} {TARGET_FILENAME} file(s) under: {base.resolve()}")
     
     if skipped_students:
-        print(f"\n⚠️  {len(skipped_students)} submission(s) missing {TARGET_FILENAME}:")
-        for student in skipped_students[:10]:  # Show first 10
-            print(f"    - {student}")
+        lines = [f"\n⚠️  {len(skipped_students)} submission(s) missing {TARGET_FILENAME}:"]
+        lines.extend(f"    - {student}" for student in islice(skipped_students, 10))  # Show first 10
         if len(skipped_students) > 10:
-            print(f"    ... and {len(skipped_students) - 10} more")
+            lines.append(f"    ... and {len(skipped_students) - 10} more")
+        sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
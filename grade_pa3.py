@@ -4,7 +4,8 @@ grade_pa3_code.py
 
 Runs Python-based tests that call pa3.* functions:
 - Each test file defines TestCase() -> (bool, str)
-- We run each test in a subprocess so timeouts/crashes don't kill the harness
+- We run tests in a pool of long-lived runner subprocesses so timeouts/crashes don't kill the harness
+  (a worker that hangs or dies is replaced)
 - We inject the student's pa3.py so `import pa3` inside the test refers to that student's code
 - Tests import util from tests/pa3/code_tests directory
 - We add tests/pa3/support/ to sys.path so `import pa3sol` works
@@ -25,16 +26,29 @@ Usage:
 """
 
 import argparse
+import collections
 import csv
+import itertools
 import json
 import os
 import pathlib
+import py_compile
+import queue
+import shutil
+import signal
 import subprocess
 import sys
 import tempfile
-from typing import List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Optional
 from datetime import datetime
 
+try:
+    import orjson  # optional C JSON codec; the stdlib json is the fallback
+except ImportError:
+    orjson = None
+
 # ---------- Defaults tailored to your project ----------
 DEFAULT_SUBMISSIONS = "downloads/CECS 229 SEC 02 4829 (Fall 2025)/Programming Assignment #3"
 DEFAULT_TESTS_DIR = "tests/pa3/code_tests"
@@ -43,17 +57,104 @@ DEFAULT_RESULTS_CSV = "pa3_code_results.csv"
 DEFAULT_SUMMARY_CSV = "pa3_code_summary.csv"
 DEFAULT_LOG_FILE = "pa3_grading_log.txt"
 DEFAULT_TIMEOUT = 20.0
+DEFAULT_JOBS = os.cpu_count() or 1  # one runner worker per core
 # -------------------------------------------------------
 
+RSA_TESTS = ('test_3_1.py', 'test_3_2.py', 'test_4_1.py', 'test_4_2.py')
+SKIP_DIRS = {".venv", "venv", "__pycache__", "node_modules", ".git"}  # never searched for pa3.py
+LOG_BUFFER_SIZE = 1 << 20  # bytes; the log is flushed on close/Ctrl-C, not per line
+CSV_BUFFER_SIZE = 1 << 20  # bytes
+CSV_CHUNK_ROWS = 128  # most rows handed to one writerows() call
+STDERR_TAIL_LINES = 4096  # worker stderr lines kept for crash reports
+WARM_UP_LIMIT = 60.0  # seconds a new worker gets to preload the tests before it is replaced
+
 RUNNER_CODE = r"""
+import ast
+import collections
 import importlib.util
+import io
 import json
 import os
 import random
+import site
 import sys
+import sysconfig
 import traceback
+import types
+from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
 
+try:
+    import orjson  # optional C JSON codec; the stdlib json is the fallback
+except ImportError:
+    orjson = None
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:  # e.g. lone surrogates, which json escapes instead
+            pass
+    return json.dumps(obj).encode()
+
+def loads(data):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:  # e.g. escaped lone surrogates, which only json accepts
+            pass
+    return json.loads(data)
+
+def write_frame(out, obj):
+    '''Send one result as "<length>\\n<json payload>".'''
+    payload = dumps(obj)
+    out.write(b"%d\n" % len(payload) + payload)
+    out.flush()
+
+MAX_OUTPUT_LINES = 4096  # output kept per job; older lines are dropped
+MAX_LINE_CHARS = 512
+
+class TailBuffer(io.TextIOBase):
+    '''Text sink that keeps only the last MAX_OUTPUT_LINES lines written to it,
+    so a runaway print loop can't exhaust memory before the timeout fires.'''
+    def __init__(self):
+        self.lines = collections.deque(maxlen=MAX_OUTPUT_LINES)
+        self.partial = ""
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if "\n" in text:
+            parts = (self.partial + text).split("\n")
+            self.partial = parts.pop()[:MAX_LINE_CHARS]
+            self.lines.extend(line[:MAX_LINE_CHARS] for line in parts[-MAX_OUTPUT_LINES:])
+        else:
+            self.partial = (self.partial + text)[:MAX_LINE_CHARS]
+        return len(text)
+
+    def getvalue(self):
+        return "\n".join([*self.lines, self.partial])
+
+# Compiled test files keyed by path. A test file is read and compiled once per
+# worker, but executed fresh for every job so its `import pa3` binds to the
+# student currently being graded.
+_test_code = {}
+
+# Taken after warm-up: the sys.modules keys every job starts from, and
+# module -> original globals for the support modules (pa3sol, util, ...)
+_base_modules = set()
+_support_state = {}
+
+# Where the stdlib and installed packages live. Modules first imported from
+# here by a job stay loaded: they aren't the student's, and C extensions
+# can't safely be imported a second time.
+_library_dirs = tuple({
+    os.path.normcase(os.path.abspath(p)) + os.sep
+    for p in [*(sysconfig.get_paths()[k] for k in ("stdlib", "platstdlib", "purelib", "platlib")),
+              site.getusersitepackages()]
+})
+
 def load_module_from_path(module_name: str, file_path: str):
     '''Load a Python module from a file path.'''
     try:
@@ -67,59 +168,124 @@ def load_module_from_path(module_name: str, file_path: str):
     except Exception as e:
         raise ImportError(f"Error loading {module_name} from {file_path}: {str(e)}\n{traceback.format_exc()}")
 
-def main():
-    # args: student_pa3_path, tests_dir, support_dir, test_file_path, seed
-    if len(sys.argv) < 6:
-        print(json.dumps({"ok": False, "message": "bad_args", "error": "Expected 5 arguments"}))
-        return
-    
-    student_pa3_path = sys.argv[1]
-    tests_dir = sys.argv[2]
-    support_dir = sys.argv[3]
-    test_file_path = sys.argv[4]
-    seed = int(sys.argv[5])
+def load_test_module(file_path: str):
+    '''Execute a test file as a fresh module, compiling it only the first time.'''
+    module_name = Path(file_path).stem
+    try:
+        code = _test_code.get(file_path)
+        if code is None:
+            code = compile(Path(file_path).read_bytes(), file_path, "exec")
+            _test_code[file_path] = code
+        mod = types.ModuleType(module_name)
+        mod.__file__ = file_path
+        sys.modules[module_name] = mod  # Register before exec
+        exec(code, mod.__dict__)
+        return mod
+    except Exception as e:
+        raise ImportError(f"Error loading {module_name} from {file_path}: {str(e)}\n{traceback.format_exc()}")
+
+def warm_up(tests_dir: str, support_names):
+    '''Compile every test and import the support modules they use.
+
+    Done once per worker process, before the parent starts timing its first
+    job. Returns the support modules that were loaded.
+    '''
+    wanted = set()
+    for name in sorted(os.listdir(tests_dir)):
+        if not (name.startswith("test_") and name.endswith(".py")):
+            continue
+        file_path = os.path.join(tests_dir, name)
+        try:
+            tree = ast.parse(Path(file_path).read_bytes(), file_path)
+            _test_code[file_path] = compile(tree, file_path, "exec")
+        except (OSError, SyntaxError, ValueError):
+            continue  # reported by the jobs that use it
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                wanted.update(alias.name.partition(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                wanted.add(node.module.partition(".")[0])
+    loaded = []
+    for module_name in sorted(wanted & support_names):
+        try:
+            importlib.import_module(module_name)
+            loaded.append(module_name)
+        except (Exception, SystemExit):
+            # Left for the first job that imports it to report
+            sys.modules.pop(module_name, None)
+    return loaded
+
+def is_library_module(name: str, mod) -> bool:
+    '''Whether a module is builtin, frozen or loaded from _library_dirs.'''
+    if name in sys.builtin_module_names:
+        return True
+    try:
+        spec = getattr(mod, "__spec__", None)
+        if spec is not None and spec.origin == "frozen":
+            return True
+        paths = [p for p in [getattr(mod, "__file__", None), *(getattr(mod, "__path__", None) or [])] if p]
+    except Exception:  # not every sys.modules entry is a well-behaved module
+        return False
+    return bool(paths) and all(os.path.normcase(os.path.abspath(p)).startswith(_library_dirs) for p in paths)
+
+def snapshot_modules(support_modules):
+    '''Record the state restore_modules() puts back after every job.'''
+    _base_modules.update(sys.modules)
+    for name in support_modules:
+        mod = sys.modules[name]
+        _support_state[name] = (mod, dict(mod.__dict__))
+
+def restore_modules():
+    '''Undo what the last job did to sys.modules and the support modules.
+
+    Otherwise a student who patches, say, pa3sol.affine_encrypt would change
+    the results of every later student on this worker.
+    '''
+    for name, mod in list(sys.modules.items()):
+        if name not in _base_modules and not is_library_module(name, mod):
+            del sys.modules[name]
+    for name, (mod, state) in _support_state.items():
+        sys.modules[name] = mod
+        mod.__dict__.clear()
+        mod.__dict__.update(state)
+
+def run_job(job):
+    student_pa3_path = job["pa3"]
+    test_file_path = job["test"]
+    seed = int(job["seed"])
 
     # Verify paths exist
     if not os.path.exists(student_pa3_path):
-        print(json.dumps({"ok": False, "message": "Student pa3.py not found", "error": f"Path does not exist: {student_pa3_path}"}))
-        return
-    
+        return {"ok": False, "message": "Student pa3.py not found", "error": f"Path does not exist: {student_pa3_path}"}
+
     if not os.path.exists(test_file_path):
-        print(json.dumps({"ok": False, "message": "Test file not found", "error": f"Path does not exist: {test_file_path}"}))
-        return
+        return {"ok": False, "message": "Test file not found", "error": f"Path does not exist: {test_file_path}"}
 
-    # Priority for imports:
-    # 1. tests_dir (for util.py used by tests)
-    # 2. support_dir (for pa3sol.py)
-    if tests_dir and os.path.exists(tests_dir):
-        sys.path.insert(0, tests_dir)
-    
-    if support_dir and os.path.exists(support_dir):
-        sys.path.insert(0, support_dir)
+    # Drop the previous job's student and test modules
+    sys.modules.pop("pa3", None)
+    sys.modules.pop(Path(test_file_path).stem, None)
 
     # Load student's pa3.py as module "pa3"
     try:
         pa3_mod = load_module_from_path("pa3", student_pa3_path)
     except Exception as e:
         error_msg = traceback.format_exc()
-        print(json.dumps({
+        return {
             "ok": False, 
             "message": "Failed to load student's pa3.py", 
             "error": error_msg
-        }))
-        return
+        }
 
     # Load the test module (it will import pa3, pa3sol, util from sys.path)
     try:
-        test_mod = load_module_from_path(Path(test_file_path).stem, test_file_path)
+        test_mod = load_test_module(test_file_path)
     except Exception as e:
         error_msg = traceback.format_exc()
-        print(json.dumps({
+        return {
             "ok": False, 
             "message": "Failed to load test file", 
             "error": error_msg
-        }))
-        return
+        }
 
     # Set deterministic random seed
     random.seed(seed)
@@ -132,14 +298,74 @@ def main():
         result, msg = test_mod.TestCase()
         ok = bool(result)
         msg = str(msg)
-        print(json.dumps({"ok": ok, "message": msg}))
+        return {"ok": ok, "message": msg}
     except Exception as e:
         error_msg = traceback.format_exc()
-        print(json.dumps({
+        return {
             "ok": False, 
             "message": "Exception during TestCase() execution", 
             "error": error_msg
-        }))
+        }
+
+def main():
+    # args: tests_dir, support_dir; jobs arrive on stdin as JSON lines and
+    # results go back as length-prefixed frames
+    # Frames go out on a private copy of stdout; fd 1 itself now points at
+    # devnull, so nothing the student writes there (os.write, C extensions)
+    # can be mistaken for a result.
+    results = os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    if len(sys.argv) < 3:
+        write_frame(results, {"ok": False, "message": "bad_args", "error": "Expected 2 arguments"})
+        return
+
+    tests_dir = sys.argv[1]
+    support_dir = sys.argv[2]
+
+    # Priority for imports:
+    # 1. tests_dir (for util.py used by tests)
+    # 2. support_dir (for pa3sol.py)
+    if tests_dir and os.path.exists(tests_dir):
+        sys.path.insert(0, tests_dir)
+    
+    if support_dir and os.path.exists(support_dir):
+        sys.path.insert(0, support_dir)
+
+    support_names = set()
+    for d in (tests_dir, support_dir):
+        if d and os.path.isdir(d):
+            support_names.update(name[:-3] for name in os.listdir(d)
+                                 if name.endswith(".py") and not name.startswith("test_"))
+    support_modules = []
+    if tests_dir and os.path.isdir(tests_dir):
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            support_modules = warm_up(tests_dir, support_names)
+    snapshot_modules(support_modules)
+    # An empty frame: warm-up is done, the parent can start timing jobs
+    results.write(b"0\n")
+    results.flush()
+
+    # Anything the student or test code prints is captured per job so it can
+    # be reported with the result.
+    for line in sys.stdin.buffer:
+        if not line.strip():
+            continue
+        captured = TailBuffer()
+        try:
+            with redirect_stdout(captured), redirect_stderr(captured):
+                result = run_job(loads(line))
+        except SystemExit as e:
+            result = {
+                "ok": False,
+                "message": f"sys.exit({e.code!r}) called during test",
+                "error": traceback.format_exc()
+            }
+        restore_modules()
+        result["output"] = captured.getvalue()
+        write_frame(results, result)
 
 if __name__ == "__main__":
     main()
@@ -147,7 +373,11 @@ if __name__ == "__main__":
 class ConsoleLogger:
     """A logger that writes to both console and file."""
     def __init__(self, log_file_path: str):
-        self.log_file = open(log_file_path, 'w', encoding='utf-8')
+        # Student output can hold lone surrogates; escape them instead of failing the run
+        self.log_file = open(log_file_path, 'w', encoding='utf-8', errors='backslashreplace',
+                             buffering=LOG_BUFFER_SIZE)
+        if hasattr(sys.stdout, "reconfigure"):
+            sys.stdout.reconfigure(errors="backslashreplace")
         self.start_time = datetime.now()
         self.log(f"=== PA3 Grading Started at {self.start_time.strftime('%Y-%m-%d %H:%M:%S')} ===")
     
@@ -157,7 +387,6 @@ class ConsoleLogger:
         log_message = f"[{timestamp}] {message}"
         print(log_message)
         self.log_file.write(log_message + '\n')
-        self.log_file.flush()
     
     def log_traceback(self, student: str, test_name: str, message: str, error: str = "", stderr: str = ""):
         """Log detailed traceback information for failed tests."""
@@ -175,6 +404,10 @@ class ConsoleLogger:
                 if line.strip():
                     self.log(f"      {line}")
     
+    def flush(self):
+        """Push buffered log lines to disk."""
+        self.log_file.flush()
+
     def close(self):
         """Close the log file."""
         end_time = datetime.now()
@@ -182,9 +415,231 @@ class ConsoleLogger:
         self.log(f"=== PA3 Grading Completed at {end_time.strftime('%Y-%m-%d %H:%M:%S')} (Duration: {duration}) ===")
         self.log_file.close()
 
+def write_rows(rw, rows: "queue.Queue[Optional[List[object]]]", errors: List[BaseException]):
+    """Drain result rows into the CSV writer until the None sentinel arrives.
+
+    A failed write is put in `errors` for the main thread to raise; rows after
+    it are still taken off the queue, but dropped.
+    """
+    done = False
+    while not done:
+        # Block for one row, then take whatever else is already waiting
+        chunk = [rows.get()]
+        while len(chunk) < CSV_CHUNK_ROWS:
+            try:
+                chunk.append(rows.get_nowait())
+            except queue.Empty:
+                break
+        done = chunk[-1] is None
+        if done:
+            chunk.pop()
+        if errors:
+            continue
+        try:
+            rw.writerows(chunk)
+        except Exception as e:
+            errors.append(e)
+
+def find_pa3(student_dir: pathlib.Path, path_hints: List[str]) -> Optional[pathlib.Path]:
+    """Locate a student's pa3.py.
+
+    `path_hints` holds relative paths where classmates' pa3.py was found. They
+    are tried before walking the folder; a hit moves to the front, and a path
+    only found by walking is added. "pa3.py" itself always stays first.
+    """
+    for i, hint in enumerate(path_hints):
+        candidate = student_dir / hint
+        if candidate.is_file():
+            if i > 1:
+                path_hints.insert(1, path_hints.pop(i))
+            return candidate
+
+    for root, dirs, files in os.walk(student_dir, topdown=True):
+        # Prune before descending so we never walk into these trees
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        if "pa3.py" in files:
+            pa3_path = pathlib.Path(root) / "pa3.py"
+            path_hints.append(pa3_path.relative_to(student_dir).as_posix())
+            return pa3_path
+    return None
+
 def find_test_files(tests_dir: pathlib.Path) -> List[pathlib.Path]:
     return sorted([p for p in tests_dir.iterdir() if p.is_file() and p.name.startswith("test_") and p.suffix==".py"])
 
+def json_dumps(obj: object) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:  # e.g. undecodable path names, which json escapes instead
+            pass
+    return json.dumps(obj).encode()
+
+def json_loads(data: bytes) -> object:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:  # e.g. lone surrogates escaped by the json fallback in dumps
+            pass
+    return json.loads(data)
+
+def write_runner(tmpdir: pathlib.Path, python_bin: str) -> str:
+    """Write RUNNER_CODE into tmpdir and precompile it; returns the file workers should run."""
+    runner_path = tmpdir / "runner.py"
+    runner_path.write_text(RUNNER_CODE, encoding="utf-8")
+    # Bytecode only loads in the interpreter version that wrote it
+    if os.path.realpath(shutil.which(python_bin) or python_bin) != os.path.realpath(sys.executable):
+        return str(runner_path)
+    return py_compile.compile(str(runner_path), cfile=str(runner_path) + "c", doraise=True)
+
+def build_result(data: Dict[str, object], returncode: int = 0) -> Dict[str, object]:
+    """Turn a runner response into the result dict used for the CSV and log."""
+    ok = bool(data.get("ok", False))
+    message = data.get("message", "")
+    error = data.get("error", "")
+    err = (data.get("output") or "").strip()
+
+    # Combine message and error for display
+    full_message = message
+    if error:
+        full_message += f"\n\nERROR:\n{error}"
+    if returncode != 0:
+        full_message += f"\n\n(subprocess exit code: {returncode})"
+    if err and not error:
+        full_message += f"\n\nOUTPUT:\n{err}"
+
+    return {"ok": ok, "message": message, "error": error, "stderr": err, "full_message": full_message}
+
+class BadFrame(bytes):
+    """Worker stdout that should have been a frame header but wasn't."""
+
+class RunnerWorker:
+    """A long-lived runner subprocess that executes one test job at a time."""
+    def __init__(self, cmd: List[str]):
+        self.cmd = cmd
+        self.closed = False
+        self._start()
+
+    def _start(self):
+        if self.closed:
+            return  # killed on Ctrl-C; the dead process stays until close()
+        self.proc = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        # A fresh queue and event per process, so a killed worker's EOF can't leak into the next one
+        self.responses: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self.ready = threading.Event()  # set once the runner has finished warm_up()
+        threading.Thread(target=self._read, args=(self.proc, self.responses, self.ready), daemon=True).start()
+        # Test output is captured inside the worker; the process's own stderr only
+        # carries interpreter-level noise (fatal errors, C extensions). Keep a
+        # bounded tail of it so a crash can be explained without unbounded memory.
+        self.stderr_tail: "collections.deque[bytes]" = collections.deque(maxlen=STDERR_TAIL_LINES)
+        self.stderr_reader = threading.Thread(target=self.stderr_tail.extend, args=(self.proc.stderr,), daemon=True)
+        self.stderr_reader.start()
+
+    @staticmethod
+    def _read(proc: subprocess.Popen, responses: "queue.Queue[Optional[bytes]]", ready: threading.Event):
+        # Frames are "<length>\n<payload>", so a payload is read in one call
+        # no matter how many newlines its tracebacks contain.
+        while True:
+            header = proc.stdout.readline()
+            if not header:
+                break
+            try:
+                size = int(header)
+            except ValueError:
+                # Not a frame header: the stream is out of sync, so the worker is restarted
+                responses.put(BadFrame(header))
+                ready.set()
+                return
+            if not size:
+                ready.set()  # warm-up done; the frames after this are results
+                continue
+            payload = proc.stdout.read(size)
+            if len(payload) < size:
+                break
+            responses.put(payload)
+        responses.put(None)
+        ready.set()
+
+    def _restart(self):
+        self.proc.kill()
+        self.proc.wait()
+        self._start()
+
+    def run(self, job: Dict[str, object], timeout: float) -> Dict[str, object]:
+        """Send one job to the worker and wait for its result."""
+        # A fresh worker's warm-up doesn't count against the job's time limit.
+        # (_read also sets `ready` at EOF, so a worker that died is reported below.)
+        if not self.ready.wait(WARM_UP_LIMIT):
+            self._restart()
+            return build_result({"ok": False, "message": f"Runner did not start within {WARM_UP_LIMIT} seconds"})
+        try:
+            self.proc.stdin.write(json_dumps(job) + b"\n")
+            self.proc.stdin.flush()
+            payload = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            self._restart()
+            return {"ok": False, "timeout": True, "full_message": f"Test timed out after {timeout} seconds"}
+        except OSError:
+            payload = None
+
+        if payload is None:
+            # The worker died mid-test (segfault, os._exit, ...): report it and start a new one
+            returncode = self.proc.wait()
+            self.stderr_reader.join(timeout=1)
+            stderr = b"".join(self.stderr_tail).decode("utf-8", "replace")
+            self._start()
+            return build_result({"output": stderr}, returncode)
+
+        try:
+            if isinstance(payload, BadFrame):
+                raise ValueError("not a frame header")
+            data = json_loads(payload)
+        except ValueError:  # json.JSONDecodeError / orjson.JSONDecodeError
+            # Can't trust anything else on this pipe; start over with a new worker
+            self._restart()
+            data = {"ok": False, "message": "Invalid JSON output", "error": f"STDOUT: {payload[:500].decode('utf-8', 'replace')}"}
+        return build_result(data)
+
+    def kill(self):
+        """Stop the worker for good without waiting for its current job, which then fails."""
+        self.closed = True
+        self.proc.kill()
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+
+class RunnerPool:
+    """A fixed set of RunnerWorkers, each handed to one job at a time."""
+    def __init__(self, cmd: List[str], size: int):
+        self.workers = [RunnerWorker(cmd) for _ in range(size)]
+        self.idle: "queue.Queue[RunnerWorker]" = queue.Queue()
+        for w in self.workers:
+            self.idle.put(w)
+
+    def run(self, job: Dict[str, object], timeout: float) -> Dict[str, object]:
+        worker = self.idle.get()
+        try:
+            return worker.run(job, timeout)
+        finally:
+            self.idle.put(worker)
+
+    def kill(self):
+        for w in self.workers:
+            w.kill()
+
+    def close(self):
+        for w in self.workers:
+            w.close()
+
 def main():
     ap = argparse.ArgumentParser(description="Run code-based PA3 tests (TestCase() in each test_*.py).")
     ap.add_argument("--submissions-dir", default=DEFAULT_SUBMISSIONS)
@@ -195,6 +650,7 @@ def main():
     ap.add_argument("--log-file", default=DEFAULT_LOG_FILE)
     ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
     ap.add_argument("--python-bin", default=sys.executable)
+    ap.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Number of runner workers")
     args = ap.parse_args()
 
     submissions_dir = pathlib.Path(args.submissions_dir)
@@ -207,6 +663,12 @@ def main():
     # Initialize logger
     logger = ConsoleLogger(str(log_file))
 
+    # Log lines are buffered; don't lose them if grading is interrupted
+    def on_sigint(signum, frame):
+        logger.flush()
+        signal.default_int_handler(signum, frame)
+    signal.signal(signal.SIGINT, on_sigint)
+
     if not submissions_dir.exists():
         logger.log(f"ERROR: Submissions directory not found: {submissions_dir.resolve()}")
         logger.close()
@@ -229,127 +691,163 @@ def main():
     results_csv.parent.mkdir(parents=True, exist_ok=True)
     summary_csv.parent.mkdir(parents=True, exist_ok=True)
 
-    # Write the runner to a temp file for subprocess isolation
-    with tempfile.TemporaryDirectory() as tmpd:
-        runner_path = pathlib.Path(tmpd) / "runner.py"
-        runner_path.write_text(RUNNER_CODE, encoding="utf-8")
-
-        # Aggregates
-        summary: Dict[str, Dict[str, int]] = {}
-
-        with open(results_csv, "w", newline="", encoding="utf-8") as rf:
-            rw = csv.writer(rf)
-            rw.writerow(["student_email(s)", "test_file", "passed", "message"])
+    # Aggregates
+    summary: Dict[str, Dict[str, int]] = {}
+
+    # backslashreplace: a lone surrogate in a student's output can't stop the CSV being written
+    with open(results_csv, "w", newline="", encoding="utf-8", errors="backslashreplace",
+              buffering=CSV_BUFFER_SIZE) as rf:
+        rw = csv.writer(rf)
+        rw.writerow(["student_email(s)", "test_file", "passed", "message"])
+
+        # The CSV is encoded and written on its own thread, fed through a queue
+        rows: "queue.Queue[Optional[List[object]]]" = queue.Queue()
+        write_errors: List[BaseException] = []
+        writer = threading.Thread(target=write_rows, args=(rw, rows, write_errors))
+        writer.start()
+        pool: Optional[RunnerPool] = None
+        runner_dir: Optional[tempfile.TemporaryDirectory] = None
+        try:
+            # Absolute paths are resolved once here rather than per job
+            tests_str = str(tests_dir.resolve())
+            support_str = str(support_dir.resolve()) if support_dir.exists() else ""
+            tfile_strs = {t.name: str(t.resolve()) for t in tests}
+
+            # (student, pa3 path, tfile, seed) for every test that has to run
+            jobs = []
+            # Every student, in the order they are written to the log and CSV
+            students: List[str] = []
+            # Students without a pa3.py
+            missing = set()
+            # Where earlier students kept pa3.py, most recently used first
+            path_hints: List[str] = ["pa3.py"]
 
             for student_dir in sorted([p for p in submissions_dir.iterdir() if p.is_dir()]):
                 student = student_dir.name
+                students.append(student)
                 summary.setdefault(student, {"total": 0, "passed": 0, "failed": 0, "missing_pa3": 0})
 
                 # Locate student's pa3.py
-                pa3_path = None
-                direct = student_dir / "pa3.py"
-                if direct.exists():
-                    pa3_path = direct
-                else:
-                    for root, dirs, files in os.walk(student_dir):
-                        if any(tag in root for tag in (".venv", "venv", "__pycache__")):
-                            continue
-                        if "pa3.py" in files:
-                            pa3_path = pathlib.Path(root) / "pa3.py"
-                            break
+                pa3_path = find_pa3(student_dir, path_hints)
 
                 if not pa3_path:
-                    for t in tests:
-                        rw.writerow([student, t.name, 0, "pa3.py not found"])
-                        summary[student]["total"] += 1
-                        summary[student]["failed"] += 1
-                    summary[student]["missing_pa3"] = 1
-                    logger.log(f"SKIP: {student}: pa3.py not found")
+                    missing.add(student)  # written out as skipped, in order, with the others
                     continue
 
-                logger.log(f"RUN: {student} -> {pa3_path.relative_to(student_dir)}")
+                logger.log(f"QUEUE: {student} -> {pa3_path.relative_to(student_dir)}")
+                pa3_str = str(pa3_path.resolve())
 
-                # Run each test in its own subprocess with a deterministic seed
+                # Each test runs with a deterministic seed
                 for idx, tfile in enumerate(tests):
-                    # Special logging for RSA tests (test cases 3 and 4)
-                    if tfile.name in ['test_3_1.py', 'test_3_2.py', 'test_4_1.py', 'test_4_2.py']:
-                        logger.log(f"    Running RSA test: {tfile.name}")
                     seed = 1337 + idx  # stable seed per test index
-                    cmd = [
-                        args.python_bin,
-                        str(runner_path),
-                        str(pa3_path.resolve()),
-                        str(tests_dir.resolve()),  # Pass tests dir for util.py
-                        str(support_dir.resolve() if support_dir.exists() else ""),
-                        str(tfile.resolve()),
-                        str(seed),
-                    ]
-                    try:
-                        proc = subprocess.run(
-                            cmd,
-                            capture_output=True,
-                            text=True,
-                            timeout=args.timeout,
-                        )
-                        out = (proc.stdout or "").strip()
-                        err = (proc.stderr or "").strip()
-                        
-                        # parse JSON
-                        data = {}
-                        try:
-                            data = json.loads(out) if out else {}
-                        except json.JSONDecodeError:
-                            data = {"ok": False, "message": "Invalid JSON output", "error": f"STDOUT: {out[:500]}\nSTDERR: {err[:500]}"}
-
-                        ok = bool(data.get("ok", False))
-                        message = data.get("message", "")
-                        error = data.get("error", "")
-
-                        # Combine message and error for display
-                        full_message = message
-                        if error:
-                            full_message += f"\n\nERROR:\n{error}"
-                        if proc.returncode != 0:
-                            full_message += f"\n\n(subprocess exit code: {proc.returncode})"
-                        if err and not error:
-                            full_message += f"\n\nSTDERR:\n{err}"
-
-                        rw.writerow([student, tfile.name, int(ok), full_message])
-                        summary[student]["total"] += 1
-                        if ok:
-                            summary[student]["passed"] += 1
-                            logger.log(f"  ✓ {tfile.name}")
-                        else:
-                            summary[student]["failed"] += 1
-                            # Enhanced logging for test cases 3 and 4 (RSA tests)
-                            if tfile.name in ['test_3_1.py', 'test_3_2.py', 'test_4_1.py', 'test_4_2.py']:
-                                logger.log_traceback(student, tfile.name, message, error, err)
-                            else:
-                                logger.log(f"  ✗ {tfile.name}: {message[:100]}")
-
-                    except subprocess.TimeoutExpired:
-                        rw.writerow([student, tfile.name, 0, f"Test timed out after {args.timeout} seconds"])
-                        summary[student]["total"] += 1
-                        summary[student]["failed"] += 1
-                        logger.log(f"  ✗ {tfile.name}: TIMEOUT")
-
-        # Write summary
-        with open(summary_csv, "w", newline="", encoding="utf-8") as sf:
-            sw = csv.writer(sf)
-            sw.writerow(["student_email(s)", "total_tests", "passed", "failed", "percent_passed", "missing_pa3"])
-            for student, s in sorted(summary.items()):
-                total = s["total"]
-                passed = s["passed"]
-                failed = s["failed"]
-                pct = (passed / total * 100.0) if total else 0.0
-                sw.writerow([student, total, passed, failed, f"{pct:.2f}", s["missing_pa3"]])
-
-        logger.log(f"✅ Results:  {results_csv.resolve()}")
-        logger.log(f"✅ Summary:  {summary_csv.resolve()}")
-        logger.log(f"✅ Log file: {log_file.resolve()}")
-        
-        # Close the logger
-        logger.close()
+                    jobs.append((student, pa3_str, tfile, seed))
+
+            logger.log(f"Running {len(jobs)} test(s) with {args.jobs} worker(s)")
+
+            # Results are collected per student. A student is written to the log
+            # and CSV once their tests and those of every student before them
+            # are done, so both stay grouped and in sorted order.
+            pending: Dict[str, int] = {}
+            for student, _, _, _ in jobs:
+                pending[student] = pending.get(student, 0) + 1
+            finished: Dict[str, Dict[str, Dict[str, object]]] = {student: {} for student in pending}
+
+            workers = max(1, args.jobs)
+            # Workers run a precompiled copy of the runner, so neither the first
+            # spawn nor a respawn after a timeout has to compile it again
+            runner_dir = tempfile.TemporaryDirectory()
+            pool = RunnerPool([
+                args.python_bin,
+                write_runner(pathlib.Path(runner_dir.name), args.python_bin),
+                tests_str,  # Pass tests dir for util.py
+                support_str,
+            ], workers)
+            with ThreadPoolExecutor(max_workers=workers) as ex:
+                try:
+                    futures = {}
+                    for student, pa3_str, tfile, seed in jobs:
+                        job = {"pa3": pa3_str, "test": tfile_strs[tfile.name], "seed": seed}
+                        futures[ex.submit(pool.run, job, args.timeout)] = (student, tfile)
+
+                    # Summary and log are only touched from this thread; rows go
+                    # to the writer thread.
+                    next_out = 0  # index in students of the next student to write out
+                    # The trailing None writes out what's left once every job is done,
+                    # including students that had no tests to run
+                    for fut in itertools.chain(as_completed(futures), [None]):
+                        if fut is not None:
+                            student, tfile = futures[fut]
+                            finished[student][tfile.name] = fut.result()
+                            pending[student] -= 1
+
+                        # Students without pa3.py aren't in `pending`, so they never hold things up
+                        while next_out < len(students) and not pending.get(students[next_out]):
+                            student = students[next_out]
+                            next_out += 1
+                            if student in missing:
+                                for t in tests:
+                                    rows.put([student, t.name, 0, "pa3.py not found"])
+                                    summary[student]["total"] += 1
+                                    summary[student]["failed"] += 1
+                                summary[student]["missing_pa3"] = 1
+                                logger.log(f"SKIP: {student}: pa3.py not found")
+                                continue
+
+                            logger.log(f"RUN: {student}")
+                            for t in tests:
+                                res = finished[student].pop(t.name)
+                                ok = bool(res["ok"])
+                                # Special logging for RSA tests (test cases 3 and 4)
+                                if t.name in RSA_TESTS:
+                                    logger.log(f"    Running RSA test: {t.name}")
+
+                                rows.put([student, t.name, int(ok), res["full_message"]])
+                                summary[student]["total"] += 1
+                                if ok:
+                                    summary[student]["passed"] += 1
+                                    logger.log(f"  ✓ {t.name}")
+                                else:
+                                    summary[student]["failed"] += 1
+                                    if res.get("timeout"):
+                                        logger.log(f"  ✗ {t.name}: TIMEOUT")
+                                    # Enhanced logging for test cases 3 and 4 (RSA tests)
+                                    elif t.name in RSA_TESTS:
+                                        logger.log_traceback(student, t.name, res["message"], res["error"], res["stderr"])
+                                    else:
+                                        logger.log(f"  ✗ {t.name}: {res['message'][:100]}")
+                except KeyboardInterrupt:
+                    # Stop right away: drop the queued jobs and kill the workers,
+                    # so leaving the executor doesn't wait for the rest of the run
+                    ex.shutdown(wait=False, cancel_futures=True)
+                    pool.kill()
+                    raise
+        finally:
+            if pool is not None:
+                pool.close()
+            if runner_dir is not None:
+                runner_dir.cleanup()
+            rows.put(None)
+            writer.join()
+        if write_errors:
+            raise write_errors[0]
+
+    # Write summary
+    with open(summary_csv, "w", newline="", encoding="utf-8") as sf:
+        sw = csv.writer(sf)
+        sw.writerow(["student_email(s)", "total_tests", "passed", "failed", "percent_passed", "missing_pa3"])
+        for student, s in sorted(summary.items()):
+            total = s["total"]
+            passed = s["passed"]
+            failed = s["failed"]
+            pct = (passed / total * 100.0) if total else 0.0
+            sw.writerow([student, total, passed, failed, f"{pct:.2f}", s["missing_pa3"]])
+
+    logger.log(f"✅ Results:  {results_csv.resolve()}")
+    logger.log(f"✅ Summary:  {summary_csv.resolve()}")
+    logger.log(f"✅ Log file: {log_file.resolve()}")
+    
+    # Close the logger
+    logger.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
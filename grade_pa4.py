@@ -4,7 +4,7 @@ grade_pa4_code.py
 
 Runs Python-based tests that call pa4.* functions:
 - Each test file defines TestCase() -> (bool, str)
-- We run each test in a subprocess so timeouts/crashes don't kill the harness
+- Tests run in long-lived runner subprocesses so timeouts/crashes don't kill the harness
 - We inject the student's pa4.py so `import pa4` inside the test refers to that student's code
 - Tests import util from tests/pa4/codetests directory
 - We add tests/pa4/codetests/ to sys.path so `import pa4sol` works
@@ -25,15 +25,28 @@ Usage:
 """
 
 import argparse
+import collections
 import csv
+import hashlib
+import io
+import itertools
 import json
 import os
 import pathlib
+import pickle
+import py_compile
+import queue
+import shutil
+import struct
 import subprocess
 import sys
 import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import Future, as_completed
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 # ---------- Defaults tailored to your project ----------
 DEFAULT_SUBMISSIONS = "downloads/CECS 229 SEC 02 4829 (Fall 2025)/Programming Assignment #4"
@@ -42,18 +55,125 @@ DEFAULT_SUPPORT_DIR = "tests/pa4/codetests"
 DEFAULT_RESULTS_CSV = "pa4_code_results.csv"
 DEFAULT_SUMMARY_CSV = "pa4_code_summary.csv"
 DEFAULT_LOG_FILE = "pa4_grading_log.txt"
+# Stands in for a student's pa4.py path in results shared with other students
+PA4_PLACEHOLDER = "\0PA4_PATH\0"
 DEFAULT_TIMEOUT = 20.0
+DEFAULT_JOBS = os.cpu_count() or 1  # one runner worker per core
 # -------------------------------------------------------
 
+SKIP_DIRS = {".venv", "venv", "__pycache__", "node_modules", ".git"}  # never searched for pa4.py
+CSV_BUFFER_SIZE = 1 << 20  # bytes
+CSV_CHUNK_ROWS = 64  # most result rows joined into one write()
+FRAME_HEADER = struct.Struct("<I")  # length prefix of each runner result frame
+TIMEOUT_GRACE = 2.0  # seconds past --timeout before an unresponsive worker is killed
+PIPELINE_DEPTH = 4  # jobs sent to a worker ahead of its results
+WARM_UP_LIMIT = 60.0  # seconds a new worker gets to preload the tests before it is replaced
+TOTAL, PASSED, FAILED, MISSING_PA4 = range(4)  # columns of a student's summary counts
+FD_OUTPUT_TAIL = 1 << 16  # bytes of fd-level worker output kept for a crash report
+# Workers' fd 1/2 go to a scratch file, on tmpfs where there is one
+SCRATCH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
 RUNNER_CODE = r"""
+import ast
 import importlib.util
+import io
 import json
 import os
+import pickle
 import random
+import signal
+import site
+import struct
 import sys
+import sysconfig
 import traceback
+import types
+from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
 
+# Compiled test files keyed by path. A test file is read and compiled once per
+# worker, but executed fresh for every job so its `import pa4` binds to the
+# student currently being graded. Support modules (pa4sol, util, ...) don't
+# import pa4, so they stay in sys.modules for the worker's lifetime; see
+# snapshot_modules() for how they are reset between students.
+_test_code = {}
+
+# Taken after warm-up: the sys.modules keys every job starts from, and
+# module -> original globals for the support modules loaded by then
+_base_modules = set()
+_support_state = {}
+
+# Where the stdlib and installed packages live. Modules first imported from
+# here by a job stay loaded: they aren't the student's, and C extensions such
+# as numpy can't safely be imported a second time.
+_library_dirs = tuple({
+    os.path.normcase(os.path.abspath(p)) + os.sep
+    for p in [*(sysconfig.get_paths()[k] for k in ("stdlib", "platstdlib", "purelib", "platlib")),
+              site.getusersitepackages()]
+})
+
+# Support module files (path -> module name), filled in by main()
+_support_files = {}
+
+# Support modules whose top-level code raised, keyed by module name. Python
+# would re-run a failed import for every job; these fail fast instead.
+_failed_imports = {}
+
+class FailedImportFinder:
+    '''Meta path finder that re-raises the first error of a broken support module.'''
+    def find_spec(self, name, path=None, target=None):
+        if name in _failed_imports:
+            raise ImportError(f"{name} failed to import earlier in this worker:\n{_failed_imports[name]}", name=name)
+        return None
+
+def remember_failed_import(exc, student_pa4_path: str):
+    '''Negative-cache the support module whose import raised `exc`.'''
+    failed = None
+    tb = exc.__traceback__
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        filename = os.path.normcase(os.path.abspath(code.co_filename))
+        if filename == student_pa4_path:
+            return  # depends on the student's code; may work for the next one
+        if code.co_name == "<module>" and filename in _support_files:
+            failed = _support_files[filename]
+        tb = tb.tb_next
+    if failed is not None:
+        _failed_imports[failed] = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+
+FD_OUTPUT_TAIL = 1 << 16  # bytes of fd-level output kept per job
+
+def take_fd_output() -> str:
+    '''Read back, and clear, what the job wrote straight to fd 1/2.
+
+    Both point at one scratch file the parent opened read/write, so this
+    catches C extensions and os.write() that redirect_stdout can't.
+    '''
+    for stream in (sys.__stdout__, sys.__stderr__):
+        if stream is not None:
+            stream.flush()
+    try:
+        end = os.lseek(1, 0, os.SEEK_CUR)
+        if not end:
+            return ""
+        start = max(0, end - FD_OUTPUT_TAIL)
+        data = os.pread(1, end - start, start)
+        os.ftruncate(1, 0)
+        os.lseek(1, 0, os.SEEK_SET)
+    except OSError:
+        return ""  # not a regular file, e.g. when run by hand
+    text = data.decode("utf-8", "replace")
+    return text if not start else "[... earlier output truncated ...]\n" + text
+
+class JobTimeout(BaseException):
+    '''Raised from SIGALRM when a job runs past its time limit.
+
+    Not an Exception, so a student's `except Exception:` can't swallow it.
+    '''
+
+def on_alarm(signum, frame):
+    raise JobTimeout()
+
 def load_module_from_path(module_name: str, file_path: str):
     '''Load a Python module from a file path.'''
     try:
@@ -67,59 +187,124 @@ def load_module_from_path(module_name: str, file_path: str):
     except Exception as e:
         raise ImportError(f"Error loading {module_name} from {file_path}: {str(e)}\n{traceback.format_exc()}")
 
-def main():
-    # args: student_pa4_path, tests_dir, support_dir, test_file_path, seed
-    if len(sys.argv) < 6:
-        print(json.dumps({"ok": False, "message": "bad_args", "error": "Expected 5 arguments"}))
-        return
+def load_test_module(file_path: str, student_pa4_path: str):
+    '''Execute a test file as a fresh module, compiling it only the first time.'''
+    module_name = Path(file_path).stem
+    try:
+        code = _test_code.get(file_path)
+        if code is None:
+            code = compile(Path(file_path).read_bytes(), file_path, "exec")
+            _test_code[file_path] = code
+        mod = types.ModuleType(module_name)
+        mod.__file__ = file_path
+        sys.modules[module_name] = mod  # Register before exec
+        exec(code, mod.__dict__)
+        return mod
+    except Exception as e:
+        remember_failed_import(e, os.path.normcase(os.path.abspath(student_pa4_path)))
+        raise ImportError(f"Error loading {module_name} from {file_path}: {str(e)}\n{traceback.format_exc()}")
+
+def warm_up(tests_dir: str):
+    '''Compile every test and import the support modules they use (pa4sol, util, ...).
+
+    Done once per worker process, before any job's timer is running, so a
+    fresh worker doesn't spend a student's time limit on them.
+    '''
+    wanted = set()
+    for name in sorted(os.listdir(tests_dir)):
+        if not (name.startswith("test_") and name.endswith(".py")):
+            continue
+        file_path = os.path.join(tests_dir, name)
+        try:
+            tree = ast.parse(Path(file_path).read_bytes(), file_path)
+            _test_code[file_path] = compile(tree, file_path, "exec")
+        except (OSError, SyntaxError, ValueError):
+            continue  # reported by the jobs that use it
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                wanted.update(alias.name.partition(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                wanted.add(node.module.partition(".")[0])
+    for module_name in sorted(wanted & set(_support_files.values())):
+        try:
+            importlib.import_module(module_name)
+        except (Exception, SystemExit):
+            # Left for the first job that imports it to report
+            sys.modules.pop(module_name, None)
+
+def is_library_module(name: str, mod) -> bool:
+    '''Whether a module is builtin, frozen or loaded from _library_dirs.'''
+    if name in sys.builtin_module_names:
+        return True
+    try:
+        spec = getattr(mod, "__spec__", None)
+        if spec is not None and spec.origin == "frozen":
+            return True
+        paths = [p for p in [getattr(mod, "__file__", None), *(getattr(mod, "__path__", None) or [])] if p]
+    except Exception:  # not every sys.modules entry is a well-behaved module
+        return False
+    return bool(paths) and all(os.path.normcase(os.path.abspath(p)).startswith(_library_dirs) for p in paths)
+
+def snapshot_modules():
+    '''Record the state restore_modules() puts back after every job.'''
+    _base_modules.update(sys.modules)
+    for name in set(_support_files.values()):
+        mod = sys.modules.get(name)
+        if mod is not None:
+            _support_state[name] = (mod, dict(mod.__dict__))
 
-    student_pa4_path = sys.argv[1]
-    tests_dir = sys.argv[2]
-    support_dir = sys.argv[3]
-    test_file_path = sys.argv[4]
-    seed = int(sys.argv[5])
+def restore_modules():
+    '''Undo what the last job did to sys.modules and the support modules.
+
+    Otherwise a student who patches, say, util.test_passed would change the
+    results of every later student on this worker.
+    '''
+    for name, mod in list(sys.modules.items()):
+        if name not in _base_modules and not is_library_module(name, mod):
+            del sys.modules[name]
+    for name, (mod, state) in _support_state.items():
+        sys.modules[name] = mod
+        mod.__dict__.clear()
+        mod.__dict__.update(state)
+
+def run_job(job):
+    student_pa4_path = job["pa4"]
+    test_file_path = job["test"]
+    seed = int(job["seed"])
 
     # Verify paths exist
     if not os.path.exists(student_pa4_path):
-        print(json.dumps({"ok": False, "message": "Student pa4.py not found", "error": f"Path does not exist: {student_pa4_path}"}))
-        return
+        return {"ok": False, "message": "Student pa4.py not found", "error": f"Path does not exist: {student_pa4_path}"}
 
     if not os.path.exists(test_file_path):
-        print(json.dumps({"ok": False, "message": "Test file not found", "error": f"Path does not exist: {test_file_path}"}))
-        return
+        return {"ok": False, "message": "Test file not found", "error": f"Path does not exist: {test_file_path}"}
 
-    # Priority for imports:
-    # 1. tests_dir (for util.py used by tests)
-    # 2. support_dir (for pa4sol.py)
-    if tests_dir and os.path.exists(tests_dir):
-        sys.path.insert(0, tests_dir)
-
-    if support_dir and os.path.exists(support_dir):
-        sys.path.insert(0, support_dir)
+    # Drop the previous job's student and test modules
+    modules = sys.modules
+    modules.pop("pa4", None)
+    modules.pop(Path(test_file_path).stem, None)
 
     # Load student's pa4.py as module "pa4"
     try:
         _ = load_module_from_path("pa4", student_pa4_path)
     except Exception:
         error_msg = traceback.format_exc()
-        print(json.dumps({
+        return {
             "ok": False,
             "message": "Failed to load student's pa4.py",
             "error": error_msg
-        }))
-        return
+        }
 
     # Load the test module (it will import pa4, pa4sol, util from sys.path)
     try:
-        test_mod = load_module_from_path(Path(test_file_path).stem, test_file_path)
+        test_mod = load_test_module(test_file_path, student_pa4_path)
     except Exception:
         error_msg = traceback.format_exc()
-        print(json.dumps({
+        return {
             "ok": False,
             "message": "Failed to load test file",
             "error": error_msg
-        }))
-        return
+        }
 
     # Set deterministic random seed
     random.seed(seed)
@@ -132,14 +317,86 @@ def main():
         result, msg = test_mod.TestCase()
         ok = bool(result)
         msg = str(msg)
-        print(json.dumps({"ok": ok, "message": msg}))
+        return {"ok": ok, "message": msg}
     except Exception:
         error_msg = traceback.format_exc()
-        print(json.dumps({
+        return {
             "ok": False,
             "message": "Exception during TestCase() execution",
             "error": error_msg
-        }))
+        }
+
+def main():
+    # args: tests_dir, support_dir, result_fd; jobs arrive on stdin as JSON
+    # lines ({"id", "pa4", "test", "seed", "timeout"}) and each result is written
+    # to result_fd as a 4-byte little-endian length followed by a pickled dict.
+    # An empty frame, sent once before the first result, means warm-up is done.
+    if len(sys.argv) < 4:
+        sys.exit("bad_args: expected tests_dir, support_dir, result_fd")
+
+    tests_dir = sys.argv[1]
+    support_dir = sys.argv[2]
+    results = os.fdopen(int(sys.argv[3]), "wb")
+    header = struct.Struct("<I")
+
+    # Priority for imports:
+    # 1. tests_dir (for util.py used by tests)
+    # 2. support_dir (for pa4sol.py)
+    if tests_dir and os.path.exists(tests_dir):
+        sys.path.insert(0, tests_dir)
+
+    if support_dir and os.path.exists(support_dir):
+        sys.path.insert(0, support_dir)
+
+    for d in (tests_dir, support_dir):
+        if d and os.path.isdir(d):
+            for name in os.listdir(d):
+                if name.endswith(".py") and not name.startswith("test_"):
+                    _support_files[os.path.normcase(os.path.abspath(os.path.join(d, name)))] = name[:-3]
+    sys.meta_path.insert(0, FailedImportFinder())
+
+    if tests_dir and os.path.isdir(tests_dir):
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            warm_up(tests_dir)
+        take_fd_output()  # not part of any job's output
+    snapshot_modules()
+    # The parent starts timing our first job from here
+    results.write(header.pack(0))
+    results.flush()
+
+    # Results have their own pipe; anything the student or test code prints
+    # is captured per job so it can be reported with the result.
+    # Read as bytes: json.loads takes them directly, with no text layer in between
+    for line in sys.stdin.buffer:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        captured = io.StringIO()
+        try:
+            # The time limit covers loading pa4 and the test as well as TestCase().
+            # The handler is set every time in case a previous job replaced it.
+            signal.signal(signal.SIGALRM, on_alarm)
+            signal.setitimer(signal.ITIMER_REAL, job["timeout"])
+            try:
+                with redirect_stdout(captured), redirect_stderr(captured):
+                    result = run_job(job)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        except SystemExit as e:
+            result = {
+                "ok": False,
+                "message": f"sys.exit({e.code!r}) called during test",
+                "error": traceback.format_exc()
+            }
+        except JobTimeout:
+            # Interrupted in place; the worker carries on with the next job
+            result = {"ok": False, "timeout": True, "message": f"Test timed out after {job['timeout']} seconds"}
+        restore_modules()
+        result["id"] = job["id"]
+        result["output"] = captured.getvalue() + take_fd_output()
+        payload = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        results.write(header.pack(len(payload)) + payload)
+        results.flush()
 
 if __name__ == "__main__":
     main()
@@ -149,19 +406,29 @@ if __name__ == "__main__":
 class ConsoleLogger:
     """A logger that writes to both console and file."""
     def __init__(self, log_file_path: str):
-        self.log_file = open(log_file_path, 'w', encoding='utf-8')
+        # Student output can hold lone surrogates; escape them instead of failing the run
+        self.log_file = open(log_file_path, 'w', encoding='utf-8', errors='backslashreplace')
+        if hasattr(sys.stdout, "reconfigure"):
+            sys.stdout.reconfigure(errors="backslashreplace")
+        # "[HH:MM:SS]" prefix, only reformatted when the second changes
+        self._last_sec = -1
+        self._last_ts = ""
         self.start_time = datetime.now()
         self.log(f"=== PA4 Grading Started at {self.start_time.strftime('%Y-%m-%d %H:%M:%S')} ===")
 
     def log(self, message: str):
         """Log message to both console and file."""
-        timestamp = datetime.now().strftime('%H:%M:%S')
-        log_message = f"[{timestamp}] {message}"
+        now = time.time()
+        sec = int(now)
+        if sec != self._last_sec:
+            self._last_sec = sec
+            self._last_ts = time.strftime('%H:%M:%S', time.localtime(now))
+        log_message = f"[{self._last_ts}] {message}"
         print(log_message)
         self.log_file.write(log_message + '\n')
         self.log_file.flush()
 
-    def log_test_details(self, student: str, test_name: str, ok: bool, message: str, error: str = "", stderr: str = ""):
+    def log_test_details(self, student: str, test_name: str, ok: bool, message: str, error: str = "", output: str = ""):
         """Log detailed test information."""
         status = "✓ PASSED" if ok else "✗ FAILED"
         self.log(f"  {status} - {test_name}")
@@ -180,11 +447,11 @@ class ConsoleLogger:
                 if line.strip():
                     self.log(f"    │   {line}")
         
-        # Log stderr if present
-        if not ok and stderr:
-            self.log(f"    ├─ STDERR:")
-            stderr_lines = stderr.split('\n')
-            for line in stderr_lines[:20]:  # Show first 20 lines of stderr
+        # Log captured output if present
+        if not ok and output:
+            self.log(f"    ├─ OUTPUT:")
+            output_lines = output.split('\n')
+            for line in output_lines[:20]:  # Show first 20 lines of output
                 if line.strip():
                     self.log(f"    │   {line}")
         
@@ -198,8 +465,420 @@ class ConsoleLogger:
         self.log_file.close()
 
 
+def find_pa4(student_dir: pathlib.Path) -> Optional[pathlib.Path]:
+    """Locate a student's pa4.py with a depth-first scan that stops at the first match."""
+    stack = [str(student_dir)]
+    while stack:
+        d = stack.pop()
+        subdirs = []
+        try:
+            with os.scandir(d) as it:
+                for entry in it:
+                    # DirEntry caches the file type from readdir, so these don't stat
+                    if entry.name == "pa4.py" and entry.is_file():
+                        return pathlib.Path(entry.path)
+                    # Prune before descending so we never walk into these trees
+                    if entry.is_dir(follow_symlinks=False) and entry.name not in SKIP_DIRS:
+                        subdirs.append(entry.path)
+        except OSError:
+            continue
+        # Reversed so the stack pops subdirectories in name order
+        stack.extend(sorted(subdirs, reverse=True))
+    return None
+
+
+def csv_row(student: str, test_name: str, passed: int, message: str) -> str:
+    """Format one results CSV row.
+
+    Equivalent to csv.writer with the default dialect, except that every text
+    field is quoted; that skips the writer's per-field quoting checks, which
+    matter for multi-KB messages.
+    """
+    return f'"{student.replace(chr(34), chr(34) * 2)}","{test_name}",{passed},"{message.replace(chr(34), chr(34) * 2)}"\r\n'
+
+
+def write_rows(rf, rows: "queue.Queue[Optional[tuple]]", errors: List[BaseException]):
+    """Format and write result rows until the None sentinel arrives.
+
+    A failed write is put in `errors` for the main thread to raise; rows after
+    it are still taken off the queue, but dropped.
+    """
+    done = False
+    while not done:
+        # Block for one row, then take whatever else is already waiting
+        chunk = [rows.get()]
+        while len(chunk) < CSV_CHUNK_ROWS:
+            try:
+                chunk.append(rows.get_nowait())
+            except queue.Empty:
+                break
+        done = chunk[-1] is None
+        if done:
+            chunk.pop()
+        if errors:
+            continue
+        try:
+            rf.write("".join([csv_row(*row) for row in chunk]))
+        except Exception as e:
+            errors.append(e)
+
+
 def find_test_files(tests_dir: pathlib.Path) -> List[pathlib.Path]:
-    return sorted([p for p in tests_dir.iterdir() if p.is_file() and p.name.startswith("test_") and p.suffix == ".py"])
+    # Name checks first; DirEntry.is_file() answers from readdir data except for symlinks
+    with os.scandir(tests_dir) as it:
+        return sorted([pathlib.Path(e.path) for e in it
+                       if e.name.startswith("test_") and e.name.endswith(".py") and e.is_file()])
+
+
+def is_own_interpreter(python_bin: str) -> bool:
+    """Whether `python_bin` is the interpreter running this script."""
+    return os.path.realpath(shutil.which(python_bin) or python_bin) == os.path.realpath(sys.executable)
+
+
+def runner_args(tmpdir: pathlib.Path, python_bin: str) -> List[str]:
+    """Arguments that make `python_bin` run RUNNER_CODE; precompiled when possible."""
+    # Bytecode only loads in the interpreter version that wrote it. Any other
+    # interpreter gets the source inline, so no file is involved at all.
+    if not is_own_interpreter(python_bin):
+        return ["-c", RUNNER_CODE]
+    runner_path = tmpdir / "runner.py"
+    runner_path.write_text(RUNNER_CODE, encoding="utf-8")
+    return [py_compile.compile(str(runner_path), cfile=str(runner_path) + "c", doraise=True)]
+
+
+def build_result(data: Dict[str, object], returncode: int = 0) -> Dict[str, object]:
+    """Turn a runner response into the result dict used for the CSV and log."""
+    if data.get("timeout"):
+        return {"ok": False, "timeout": True, "full_message": data.get("message", "")}
+
+    ok = bool(data.get("ok", False))
+    message = data.get("message", "")
+    error = data.get("error", "")
+    output = (data.get("output") or "").strip()
+
+    full_message = message
+    if error:
+        full_message += f"\n\nERROR:\n{error}"
+    if returncode != 0:
+        full_message += f"\n\n(subprocess exit code: {returncode})"
+    if output and not error:
+        full_message += f"\n\nOUTPUT:\n{output}"
+
+    # A worker that died or sent garbage says nothing reliable about the code
+    crashed = returncode != 0 or bool(data.get("crashed"))
+    return {"ok": ok, "message": message, "error": error, "output": output, "full_message": full_message,
+            "crashed": crashed}
+
+
+def swap_pa4_path(result: Dict[str, object], old: str, new: str) -> Dict[str, object]:
+    """Copy of `result` with every mention of the pa4.py path `old` replaced by `new`.
+
+    Used to hand one student's result to another with an identical file
+    without leaking the first student's path (and email) in tracebacks.
+    """
+    return {k: v.replace(old, new) if isinstance(v, str) else v for k, v in result.items()}
+
+
+def check_syntax(source: bytes, pa4_path: str) -> Optional[Dict[str, object]]:
+    """Compile a student's pa4.py without running it.
+
+    Returns the result every test would get if it doesn't compile, else None.
+    The builtin compile() is used rather than py_compile so nothing is written
+    into the submission.
+    """
+    try:
+        compile(source, pa4_path, "exec", dont_inherit=True)
+    # ValueError: null bytes on older Pythons. The others come from pathological
+    # input such as a 200,000-deep expression, which would otherwise end the run.
+    except (SyntaxError, ValueError, MemoryError, RecursionError, OverflowError) as e:
+        error = "".join(traceback.format_exception_only(type(e), e))
+        return build_result({"ok": False, "message": "Failed to load student's pa4.py", "error": error})
+    return None
+
+
+def cache_fingerprint(dirs: List[pathlib.Path], python_bin: str, timeout: float) -> str:
+    """Hash everything other than pa4.py that a test result depends on.
+
+    That is this script (runner included), the interpreter the workers run, the
+    time limit, and every file in the tests/support directories. Test names are
+    included in order, since a test's seed comes from its position.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(pathlib.Path(__file__).read_bytes())
+    h.update(os.path.realpath(shutil.which(python_bin) or python_bin).encode())
+    h.update(f"timeout={timeout!r}\0".encode())
+    seen = set()
+    for d in dirs:
+        if not d.is_dir():
+            continue
+        for f in sorted(p for p in d.iterdir() if p.is_file()):
+            if f.resolve() in seen:
+                continue
+            seen.add(f.resolve())
+            h.update(f.name.encode() + b"\0" + f.read_bytes() + b"\0")
+    return h.hexdigest()
+
+
+def cacheable(res: Dict[str, object]) -> bool:
+    """Whether a result depends only on what cache_fingerprint() and the pa4.py digest cover.
+
+    Timeouts and crashes can come down to machine load, and a failed import
+    can come down to which packages are installed, so those are rerun.
+    """
+    return not (res.get("timeout") or res.get("crashed")
+                or str(res.get("message", "")).startswith("Failed to load"))
+
+
+def load_cache(path: pathlib.Path, fingerprint: str) -> Dict[str, Dict[str, Dict[str, object]]]:
+    """Results saved by an earlier run with the same fingerprint: digest -> test name -> result."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("fingerprint") != fingerprint:
+        return {}
+    results = data.get("results")
+    return results if isinstance(results, dict) else {}
+
+
+def save_cache(path: pathlib.Path, fingerprint: str, results: Dict[str, Dict[str, Dict[str, object]]]):
+    # Write a sibling file and swap it in, so an interrupted save can't leave a truncated cache
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"fingerprint": fingerprint, "results": results}, fh)
+    os.replace(tmp, path)
+
+
+class ResultUnpickler(pickle.Unpickler):
+    """Unpickler for runner results, which only ever hold dicts of str/int/bool."""
+    def find_class(self, module, name):
+        # The runner executes student code; never import anything it names
+        raise pickle.UnpicklingError(f"unexpected global {module}.{name} in runner result")
+
+
+def load_result(payload: bytes) -> Dict[str, object]:
+    data = ResultUnpickler(io.BytesIO(payload)).load()
+    if not isinstance(data, dict):
+        raise pickle.UnpicklingError(f"expected a dict, got {type(data).__name__}")
+    return data
+
+
+# Held while a worker is spawned, so only that worker inherits its result pipe
+SPAWN_LOCK = threading.Lock()
+
+
+class RunnerWorker:
+    """A long-lived runner subprocess with up to PIPELINE_DEPTH jobs in flight.
+
+    A writer thread takes jobs from the pool's shared queue and sends them as
+    soon as a slot is free, without waiting for earlier results. The runner
+    handles them in order, so results are matched to the oldest job still in
+    flight. If the worker has to be replaced, whatever is still in flight is
+    sent again to its successor.
+    """
+    def __init__(self, cmd: List[str], jobs: "queue.Queue", timeout: float):
+        self.cmd = cmd
+        self.jobs = jobs
+        self.timeout = timeout
+        self.lock = threading.Condition()
+        # job id -> (job, future), oldest first
+        self.in_flight: "collections.OrderedDict[int, tuple]" = collections.OrderedDict()
+        self.slots = threading.Semaphore(PIPELINE_DEPTH)
+        self.head_since: Optional[float] = None  # when the oldest in-flight job started
+        # Whether the current process has finished warm_up(); jobs are only timed after that
+        self.ready = False
+        self.started_at = 0.0
+        self.closed = False
+        # Unlinked right away; reused (truncated) by every process this worker spawns
+        self.scratch = tempfile.TemporaryFile(dir=SCRATCH_DIR)
+        with self.lock:
+            self._start()
+        self.writer = threading.Thread(target=self._write_jobs, daemon=True)
+        self.writer.start()
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _start(self):
+        # Caller holds self.lock.
+        # Results come back on a pipe of their own, so nothing the test prints
+        # (or a C extension writes to fd 1) can get mixed into them
+        read_fd, write_fd = os.pipe()
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.scratch.truncate(0)
+        self.scratch.seek(0)
+        # close_fds=False lets CPython spawn with posix_spawn (vfork) instead of
+        # fork+exec. That is safe because Python opens every fd non-inheritable;
+        # the write end is made inheritable only for this one spawn.
+        try:
+            with SPAWN_LOCK:
+                os.set_inheritable(write_fd, True)
+                self.proc = subprocess.Popen(
+                    self.cmd + [str(write_fd)],
+                    stdin=subprocess.PIPE,
+                    stdout=self.scratch,
+                    stderr=subprocess.STDOUT,
+                    close_fds=False,
+                )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        results = os.fdopen(read_fd, "rb")
+        threading.Thread(target=self._read, args=(self.proc, results), daemon=True).start()
+
+    def _send(self, job: Dict[str, object]):
+        # Caller holds self.lock
+        try:
+            self.proc.stdin.write(json.dumps(job).encode() + b"\n")
+            self.proc.stdin.flush()
+        except OSError:
+            pass  # the worker died; its reader restarts it and sends the job again
+
+    def _restart(self):
+        # Caller holds self.lock
+        self.proc.kill()
+        self.proc.wait()
+        self._start()
+        for job, _ in self.in_flight.values():
+            self._send(job)
+        self.head_since = None  # set again once the new process is ready
+        self.lock.notify_all()
+
+    def _finish_head(self, result: Dict[str, object]):
+        # Caller holds self.lock
+        _, (_, future) = self.in_flight.popitem(last=False)
+        future.set_result(result)
+        self.slots.release()
+        # The runner moves straight on to the next job it was sent
+        self.head_since = time.monotonic() if self.in_flight and self.ready else None
+        self.lock.notify_all()
+
+    def _write_jobs(self):
+        while True:
+            self.slots.acquire()
+            item = self.jobs.get()
+            if item is None:  # shutdown
+                return
+            job, future = item
+            with self.lock:
+                self.in_flight[job["id"]] = (job, future)
+                if self.head_since is None and self.ready:
+                    self.head_since = time.monotonic()
+                self._send(job)
+                self.lock.notify_all()
+
+    def _read(self, proc: subprocess.Popen, results):
+        # Each frame is a 4-byte length followed by that many bytes of payload
+        with results:
+            while True:
+                header = results.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                (size,) = FRAME_HEADER.unpack(header)
+                if not size:
+                    # Warm-up is over: only now does the first job's time start
+                    with self.lock:
+                        if proc is not self.proc:
+                            return
+                        self.ready = True
+                        if self.in_flight:
+                            self.head_since = time.monotonic()
+                        self.lock.notify_all()
+                    continue
+                payload = results.read(size)
+                if len(payload) < size:
+                    break
+                with self.lock:
+                    if proc is not self.proc:
+                        return  # replaced while this frame was being read
+                    try:
+                        data = load_result(payload)
+                        if not self.in_flight or data.get("id") != next(iter(self.in_flight)):
+                            raise ValueError(f"result for unexpected job id {data.get('id')!r}")
+                    except Exception as e:  # pickle raises a wide range of errors on bad input
+                        # Can't trust anything else on this pipe; start over with a new worker
+                        if self.in_flight:
+                            self._finish_head(build_result({"ok": False, "crashed": True, "message": "Invalid result frame",
+                                                           "error": f"{e!r}: {payload[:500]!r}"}))
+                        self._restart()
+                        return
+                    self._finish_head(build_result(data))
+
+        with self.lock:
+            if proc is not self.proc or self.closed:
+                return
+            # The worker died mid-test (segfault, os._exit, ...): report it and start a new one
+            returncode = proc.wait()
+            if self.in_flight:
+                self._finish_head(build_result({"output": self._crash_output()}, returncode))
+            self._restart()
+
+    def _crash_output(self) -> str:
+        """Whatever a dead worker wrote to fd 1/2 during its last job."""
+        end = os.fstat(self.scratch.fileno()).st_size
+        start = max(0, end - FD_OUTPUT_TAIL)
+        return os.pread(self.scratch.fileno(), end - start, start).decode("utf-8", "replace")
+
+    def _watch(self):
+        # The runner stops a job itself once its timeout runs out. A worker that
+        # hasn't answered TIMEOUT_GRACE seconds after that (e.g. stuck inside C
+        # code where the alarm can't interrupt it) is killed and replaced. So is
+        # one still warming up WARM_UP_LIMIT seconds after it was started.
+        with self.lock:
+            while not self.closed:
+                if self.head_since is not None:
+                    deadline = self.head_since + self.timeout + TIMEOUT_GRACE
+                elif self.in_flight and not self.ready:
+                    deadline = self.started_at + WARM_UP_LIMIT
+                else:
+                    self.lock.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self.lock.wait(remaining)
+                    continue
+                if self.ready:
+                    self._finish_head({"ok": False, "timeout": True, "full_message": f"Test timed out after {self.timeout} seconds"})
+                else:
+                    self._finish_head(build_result({"ok": False, "crashed": True,
+                                                    "message": f"Runner did not start within {WARM_UP_LIMIT} seconds"}))
+                self._restart()
+
+    def close(self):
+        self.writer.join()
+        with self.lock:
+            self.closed = True
+            self.lock.notify_all()
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.proc.kill()
+            self.proc.wait()
+        self.scratch.close()
+
+
+class RunnerPool:
+    """A fixed set of RunnerWorkers fed from one shared job queue."""
+    def __init__(self, cmd: List[str], size: int, timeout: float):
+        self.timeout = timeout
+        self.ids = itertools.count()
+        self.jobs: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self.workers = [RunnerWorker(cmd, self.jobs, timeout) for _ in range(size)]
+
+    def submit(self, job: Dict[str, object]) -> Future:
+        """Queue one job; the future resolves to its result dict."""
+        future: Future = Future()
+        self.jobs.put((dict(job, id=next(self.ids), timeout=self.timeout), future))
+        return future
+
+    def close(self):
+        for _ in self.workers:
+            self.jobs.put(None)
+        for w in self.workers:
+            w.close()
 
 
 def main():
@@ -210,9 +889,13 @@ def main():
     ap.add_argument("--results-csv", default=DEFAULT_RESULTS_CSV)
     ap.add_argument("--summary-csv", default=DEFAULT_SUMMARY_CSV)
     ap.add_argument("--log-file", default=DEFAULT_LOG_FILE)
+    ap.add_argument("--cache-file", default="",
+                    help="Keep results in this file and reuse them for unchanged pa4.py files on later runs "
+                         "(off by default; delete the file after changing installed packages)")
     ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
     ap.add_argument("--python-bin", default=sys.executable)
     ap.add_argument("--verbose", action="store_true", help="Show detailed test output in console")
+    ap.add_argument("--jobs", type=int, default=DEFAULT_JOBS, help="Number of runner workers")
     args = ap.parse_args()
 
     submissions_dir = pathlib.Path(args.submissions_dir)
@@ -241,130 +924,216 @@ def main():
         logger.close()
         raise SystemExit(f"No test_*.py found in {tests_dir.resolve()}")
 
+    # Absolute paths are resolved once here rather than per job
+    tests_str = str(tests_dir.resolve())
+    support_str = str(support_dir.resolve()) if support_dir.exists() else ""
+    tfile_strs = {t.name: str(t.resolve()) for t in tests}
+
     logger.log(f"Found {len(tests)} test(s): {[t.name for t in tests]}")
     logger.log(f"Submissions directory: {submissions_dir.resolve()}")
-    logger.log(f"Tests directory: {tests_dir.resolve()}")
+    logger.log(f"Tests directory: {tests_str}")
     logger.log(f"Timeout: {args.timeout}s")
     logger.log("")
 
     results_csv.parent.mkdir(parents=True, exist_ok=True)
     summary_csv.parent.mkdir(parents=True, exist_ok=True)
 
-    summary: Dict[str, Dict[str, int]] = {}
+    # Summary counts per student, indexed like student_dirs
+    student_names: List[str] = []
+    counts: List[List[int]] = []
 
     with tempfile.TemporaryDirectory() as tmpd:
-        runner_path = pathlib.Path(tmpd) / "runner.py"
-        runner_path.write_text(RUNNER_CODE, encoding="utf-8")
+        # Workers run a precompiled copy of the runner, so neither the first
+        # spawn nor a respawn after a timeout has to compile it again
+        runner = runner_args(pathlib.Path(tmpd), args.python_bin)
 
-        with open(results_csv, "w", newline="", encoding="utf-8") as rf:
+        # backslashreplace: a lone surrogate in a student's output can't stop the CSV being written
+        with open(results_csv, "w", newline="", encoding="utf-8", errors="backslashreplace",
+                  buffering=CSV_BUFFER_SIZE) as rf:
             rw = csv.writer(rf)
             rw.writerow(["student_email(s)", "test_file", "passed", "message"])
 
-            student_dirs = sorted([p for p in submissions_dir.iterdir() if p.is_dir()])
-            logger.log(f"Processing {len(student_dirs)} student submission(s)...")
-            logger.log("=" * 80)
+            # Rows are formatted and written on their own thread, fed through a queue
+            rows: "queue.Queue[Optional[tuple]]" = queue.Queue()
+            write_errors: List[BaseException] = []
+            writer = threading.Thread(target=write_rows, args=(rf, rows, write_errors))
+            writer.start()
+            try:
+                student_dirs = sorted([p for p in submissions_dir.iterdir() if p.is_dir()])
+                student_names = [d.name for d in student_dirs]
+                counts = [[0, 0, 0, 0] for _ in student_dirs]
+                logger.log(f"Processing {len(student_dirs)} student submission(s)...")
+                logger.log("=" * 80)
 
-            for student_idx, student_dir in enumerate(student_dirs, 1):
-                student = student_dir.name
-                summary.setdefault(student, {"total": 0, "passed": 0, "failed": 0, "missing_pa4": 0})
+                # (student, pa4 path, tfile, seed) for every test that has to run
+                jobs = []
+                # Queued students -> pa4.py relative to their folder, for the log
+                queued: Dict[str, pathlib.Path] = {}
+                # Students whose pa4.py doesn't compile -> the result of every test
+                broken: Dict[str, Dict[str, object]] = {}
+                # Only meaningful if the workers run the same Python version as us
+                precheck = is_own_interpreter(args.python_bin)
+                # blake2b of each student's pa4.py. Identical files get identical
+                # results (tests are seeded), so they share one set of test runs.
+                digests: Dict[str, str] = {}
 
-                logger.log(f"\n[{student_idx}/{len(student_dirs)}] Processing: {student}")
-                logger.log("-" * 80)
+                for student_dir in student_dirs:
+                    student = student_dir.name
 
-                pa4_path = None
-                direct = student_dir / "pa4.py"
-                if direct.exists():
-                    pa4_path = direct
-                else:
-                    for root, dirs, files in os.walk(student_dir):
-                        if any(tag in root for tag in (".venv", "venv", "__pycache__")):
-                            continue
-                        if "pa4.py" in files:
-                            pa4_path = pathlib.Path(root) / "pa4.py"
-                            break
-
-                if not pa4_path:
-                    for t in tests:
-                        rw.writerow([student, t.name, 0, "pa4.py not found"])
-                        summary[student]["total"] += 1
-                        summary[student]["failed"] += 1
-                    summary[student]["missing_pa4"] = 1
-                    logger.log(f"  ⚠️  SKIPPED: pa4.py not found")
-                    continue
+                    pa4_path = find_pa4(student_dir)
+
+                    if not pa4_path:
+                        continue  # written out as skipped, in order, with the others
+
+                    queued[student] = pa4_path.relative_to(student_dir)
+                    pa4_str = str(pa4_path.resolve())
 
-                logger.log(f"  📁 Found: {pa4_path.relative_to(student_dir)}")
-
-                for idx, tfile in enumerate(tests, 1):
-                    seed = 1337 + idx
-                    cmd = [
-                        args.python_bin,
-                        str(runner_path),
-                        str(pa4_path.resolve()),
-                        str(tests_dir.resolve()),
-                        str(support_dir.resolve() if support_dir.exists() else ""),
-                        str(tfile.resolve()),
-                        str(seed),
-                    ]
                     try:
-                        proc = subprocess.run(
-                            cmd,
-                            capture_output=True,
-                            text=True,
-                            timeout=args.timeout,
-                        )
-                        out = (proc.stdout or "").strip()
-                        err = (proc.stderr or "").strip()
-
-                        try:
-                            data = json.loads(out) if out else {}
-                        except json.JSONDecodeError:
-                            data = {"ok": False, "message": "Invalid JSON output", "error": f"STDOUT: {out[:500]}\nSTDERR: {err[:500]}"}
-
-                        ok = bool(data.get("ok", False))
-                        message = data.get("message", "")
-                        error = data.get("error", "")
-
-                        full_message = message
-                        if error:
-                            full_message += f"\n\nERROR:\n{error}"
-                        if proc.returncode != 0:
-                            full_message += f"\n\n(subprocess exit code: {proc.returncode})"
-                        if err and not error:
-                            full_message += f"\n\nSTDERR:\n{err}"
-
-                        rw.writerow([student, tfile.name, int(ok), full_message])
-                        summary[student]["total"] += 1
-                        if ok:
-                            summary[student]["passed"] += 1
-                        else:
-                            summary[student]["failed"] += 1
-
-                        # Log detailed test information
-                        logger.log_test_details(student, tfile.name, ok, message, error, err)
-
-                    except subprocess.TimeoutExpired:
-                        timeout_msg = f"Test timed out after {args.timeout} seconds"
-                        rw.writerow([student, tfile.name, 0, timeout_msg])
-                        summary[student]["total"] += 1
-                        summary[student]["failed"] += 1
-                        logger.log(f"  ✗ FAILED - {tfile.name}")
-                        logger.log(f"    │ {timeout_msg}")
-                        logger.log(f"    └─ End of {tfile.name}")
-
-                # Log student summary
-                s = summary[student]
-                logger.log(f"\n  📊 Student Summary: {s['passed']}/{s['total']} passed ({s['passed']/s['total']*100:.1f}%)")
+                        source = pa4_path.read_bytes()
+                    except OSError:
+                        source = None  # the runner reports unreadable files
+                    if source is not None:
+                        digests[student] = hashlib.blake2b(source, digest_size=16).hexdigest()
+
+                        # A pa4.py that doesn't compile fails every test the same way;
+                        # record that once instead of loading it for each test
+                        load_error = check_syntax(source, pa4_str) if precheck else None
+                        if load_error:
+                            broken[student] = load_error
+                            continue
+
+                    for idx, tfile in enumerate(tests, 1):
+                        seed = 1337 + idx
+                        jobs.append((student, pa4_str, tfile, seed))
+
+                # Results are collected per student. A student is written to the log
+                # and CSV once their tests and those of every student before them
+                # are done, so both stay grouped and in student_dirs order.
+                pending: Dict[str, int] = {student: len(tests) for student in queued}
+                finished: Dict[str, Dict[str, Dict[str, object]]] = {student: {} for student in queued}
+
+                workers = max(1, args.jobs)
+                pool = RunnerPool([
+                    args.python_bin,
+                    # Ignore PYTHON* env vars. Not -I: that also drops user site-packages,
+                    # where `pip install --user` puts the numpy/matplotlib plotting.py needs.
+                    "-E",
+                    *runner,
+                    tests_str,  # Pass tests dir for util.py
+                    support_str,
+                ], workers, args.timeout)
+                cache_file = pathlib.Path(args.cache_file) if args.cache_file else None
+                fingerprint = cache_fingerprint([tests_dir, support_dir], args.python_bin, args.timeout) if cache_file else ""
+                cache = load_cache(cache_file, fingerprint) if cache_file else {}
+                # What the next run may reuse: only files graded this time, no
+                # timeouts or worker crashes, with pa4 paths swapped for PA4_PLACEHOLDER
+                new_cache: Dict[str, Dict[str, Dict[str, object]]] = {}
+
+                futures = {}
+                for student, result in broken.items():
+                    for tfile in tests:
+                        fut: Future = Future()
+                        fut.set_result(result)
+                        futures[fut] = (student, tfile)
+
+                # (digest, test name) -> (future of the first job for that file, its pa4 path)
+                first_run: Dict[tuple, tuple] = {}
+                # student -> resolved pa4.py path, as it appears in that student's tracebacks
+                pa4_strs: Dict[str, str] = {}
+                reused = 0
+                for student, pa4_str, tfile, seed in jobs:
+                    pa4_strs[student] = pa4_str
+                    digest = digests.get(student)
+                    cached = cache.get(digest, {}).get(tfile.name) if digest else None
+                    if cached is not None:
+                        fut = Future()
+                        fut.set_result(swap_pa4_path(cached, PA4_PLACEHOLDER, pa4_str))
+                        reused += 1
+                    elif digest and (digest, tfile.name) in first_run:
+                        # Same file as an earlier student: take that job's result, with this student's path
+                        fut = Future()
+                        first, first_pa4 = first_run[(digest, tfile.name)]
+                        first.add_done_callback(
+                            lambda f, fut=fut, old=first_pa4, new=pa4_str: fut.set_result(swap_pa4_path(f.result(), old, new)))
+                        reused += 1
+                    else:
+                        job = {"pa4": pa4_str, "test": tfile_strs[tfile.name], "seed": seed}
+                        fut = pool.submit(job)
+                        if digest:
+                            first_run[(digest, tfile.name)] = (fut, pa4_str)
+                    futures[fut] = (student, tfile)
+
+                logger.log(f"\nRunning {len(jobs) - reused} test(s) with {args.jobs} worker(s); "
+                           f"{reused} result(s) reused from identical pa4.py files")
+
+                # Summary and log are only touched from this thread; rows go
+                # to the writer thread.
+                next_out = 0  # index in student_dirs of the next student to write out
+                # The trailing None writes out what's left once every job is done,
+                # including students that had no tests to run
+                for fut in itertools.chain(as_completed(futures), [None]):
+                    if fut is not None:
+                        student, tfile = futures[fut]
+                        res = fut.result()
+                        finished[student][tfile.name] = res
+                        digest = digests.get(student)
+                        if digest and student not in broken and cacheable(res):
+                            new_cache.setdefault(digest, {})[tfile.name] = swap_pa4_path(res, pa4_strs[student], PA4_PLACEHOLDER)
+                        pending[student] -= 1
+
+                    # Students without pa4.py aren't in `pending`, so they never hold things up
+                    while next_out < len(student_names) and not pending.get(student_names[next_out]):
+                        student = student_names[next_out]
+                        next_out += 1
+                        logger.log(f"\n[{next_out}/{len(student_dirs)}] Processing: {student}")
+                        logger.log("-" * 80)
+
+                        c = counts[next_out - 1]
+                        if student not in queued:
+                            for t in tests:
+                                rows.put((student, t.name, 0, "pa4.py not found"))
+                            c[:] = [len(tests), 0, len(tests), 1]
+                            logger.log(f"  ⚠️  SKIPPED: pa4.py not found")
+                            continue
+
+                        logger.log(f"  📁 Found: {queued[student]}")
+
+                        for t in tests:
+                            res = finished[student].pop(t.name)
+                            ok = bool(res["ok"])
+                            rows.put((student, t.name, int(ok), res["full_message"]))
+                            c[TOTAL] += 1
+                            c[PASSED if ok else FAILED] += 1
+
+                            if res.get("timeout"):
+                                logger.log(f"  ✗ FAILED - {t.name}")
+                                logger.log(f"    │ {res['full_message']}")
+                                logger.log(f"    └─ End of {t.name}")
+                            else:
+                                # Log detailed test information
+                                logger.log_test_details(student, t.name, ok, res["message"], res["error"], res["output"])
+
+                        # Log student summary
+                        logger.log(f"\n  📊 Student Summary: {c[PASSED]}/{c[TOTAL]} passed ({c[PASSED]/c[TOTAL]*100:.1f}%)")
+
+                pool.close()
+
+                if cache_file:
+                    save_cache(cache_file, fingerprint, new_cache)
+            finally:
+                rows.put(None)
+                writer.join()
+            if write_errors:
+                raise write_errors[0]
 
     # Write summary CSV
     with open(summary_csv, "w", newline="", encoding="utf-8") as sf:
         sw = csv.writer(sf)
         sw.writerow(["student_email(s)", "total_tests", "passed", "failed", "percent_passed", "missing_pa4"])
-        for student, s in sorted(summary.items()):
-            total = s["total"]
-            passed = s["passed"]
-            failed = s["failed"]
+        # student_dirs is sorted, so rows come out in name order
+        for student, (total, passed, failed, missing_pa4) in zip(student_names, counts):
             pct = (passed / total * 100.0) if total else 0.0
-            sw.writerow([student, total, passed, failed, f"{pct:.2f}", s["missing_pa4"]])
+            sw.writerow([student, total, passed, failed, f"{pct:.2f}", missing_pa4])
 
     logger.log("\n" + "=" * 80)
     logger.log(f"✅ Results:  {results_csv.resolve()}")